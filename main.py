@@ -6,12 +6,28 @@ This server implements the Model Context Protocol (MCP) with search and fetch
 capabilities designed to work with ChatGPT's deep research feature using Azure OpenAI.
 """
 
+import asyncio
+import hashlib
 import logging
+import math
 import os
-from typing import Dict, List, Any
-
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional, Tuple
+
+import httpx
 from fastmcp import FastMCP
-from openai import AzureOpenAI
+from openai import (APIConnectionError, APIStatusError, AsyncAzureOpenAI,
+                    DefaultAsyncHttpxClient, NotFoundError, RateLimitError)
+
+try:
+    import orjson
+except ImportError:  # Optional; FastMCP's default serializer is used instead
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,18 +36,419 @@ logger = logging.getLogger(__name__)
 # Azure OpenAI configuration
 AZURE_OPENAI_API_KEY = os.environ.get("AZURE_OPENAI_API_KEY")
 AZURE_OPENAI_ENDPOINT = os.environ.get("AZURE_OPENAI_ENDPOINT")
+AZURE_OPENAI_HOST = AZURE_OPENAI_ENDPOINT.split(
+    '//', 1)[-1].rstrip('/') if AZURE_OPENAI_ENDPOINT else ""
 AZURE_OPENAI_API_VERSION = os.environ.get("AZURE_OPENAI_API_VERSION",
                                           "2024-05-01-preview")
 AZURE_OPENAI_DEPLOYMENT_NAME = os.environ.get("AZURE_OPENAI_DEPLOYMENT_NAME")
 VECTOR_STORE_ID = os.environ.get("VECTOR_STORE_ID", "")
+# Search through the single-request Responses API instead of the Assistants
+# API; requires an API version of 2025-03-01-preview or later
+USE_RESPONSES_API = os.environ.get("USE_RESPONSES_API",
+                                   "false").lower() == "true"
+# Embedding deployment for the semantic search cache; unset disables it
+AZURE_OPENAI_EMBEDDING_DEPLOYMENT = os.environ.get(
+    "AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+
+# Search result cache configuration
+SEARCH_CACHE_MAX_SIZE = 512
+SEARCH_CACHE_TTL_S = float(os.environ.get("SEARCH_CACHE_TTL_S", "3600"))
+SEARCH_CACHE_SIMILARITY = float(
+    os.environ.get("SEARCH_CACHE_SIMILARITY", "0.95"))
+SEARCH_SHORT_TTL_S = 30
+
+# Run polling configuration
+RUN_POLL_INITIAL_S = 0.1
+RUN_POLL_MAX_S = 2.0
+RUN_TERMINAL_STATUSES = ("completed", "incomplete", "failed", "cancelled",
+                         "expired")
+
+# File metadata cache configuration
+FILENAME_CACHE_MAX_SIZE = 10000
+FILENAME_CACHE_TTL_S = 86400
+FILENAME_LIST_REFRESH_S = 600
+
+# Extracted document cache configuration
+FETCH_CACHE_PATH = os.environ.get("FETCH_CACHE_PATH", "cache.db")
+FETCH_CACHE_TTL_S = float(os.environ.get("FETCH_CACHE_TTL_S", "86400"))
+
+# Request throttling configuration; AZURE_MAX_RPM=0 disables the rate limiter
+AZURE_MAX_INFLIGHT = int(os.environ.get("AZURE_MAX_INFLIGHT", "20"))
+AZURE_MAX_RPM = int(os.environ.get("AZURE_MAX_RPM", "0"))
+AZURE_RETRY_ATTEMPTS = 5
+AZURE_RETRY_BACKOFF_S = 1.0
+AZURE_RETRY_MAX_DELAY_S = 60.0
+
+# Connection pool configuration
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 100
+HTTP_MAX_CONNECTIONS = 1000
+# No more connections than can ever be in flight at once under _az_sem
+HTTP_WARMUP_CONNECTIONS = min(AZURE_MAX_INFLIGHT,
+                              HTTP_MAX_KEEPALIVE_CONNECTIONS)
+
+# Shared HTTP client so connections to Azure are kept alive and reused;
+# built on the SDK's client to keep its defaults such as following redirects
+http_client = DefaultAsyncHttpxClient(
+    limits=httpx.Limits(max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                        max_connections=HTTP_MAX_CONNECTIONS,
+                        keepalive_expiry=60.0),
+    timeout=httpx.Timeout(connect=5.0, read=120.0, write=30.0, pool=5.0))
 
 # Initialize Azure OpenAI client
-azure_client = AzureOpenAI(
+azure_client = AsyncAzureOpenAI(
     api_key=AZURE_OPENAI_API_KEY,
     api_version=AZURE_OPENAI_API_VERSION,
-    azure_endpoint=AZURE_OPENAI_ENDPOINT
+    azure_endpoint=AZURE_OPENAI_ENDPOINT,
+    http_client=http_client,
+    # The SDK's own retries are off: _call_azure retries the same errors
+    # (429, 408, 409, 5xx, connection errors and timeouts) after releasing
+    # its request slot, and stream_thread retries 429s when opening a stream
+    max_retries=0
 ) if AZURE_OPENAI_API_KEY and AZURE_OPENAI_ENDPOINT else None
 
+
+class _RateLimiter:
+    """Token bucket allowing `rate` acquisitions per `period` seconds."""
+
+    def __init__(self, rate: int, period: float = 60.0):
+        self.rate = rate
+        self.period = period
+        self.tokens = float(rate)
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.rate, self.tokens +
+                    (now - self.updated_at) * self.rate / self.period)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep(
+                    (1 - self.tokens) * self.period / self.rate)
+
+
+# Bound concurrent requests and request rate against the Azure deployment
+_az_sem = asyncio.Semaphore(AZURE_MAX_INFLIGHT)
+_az_limiter = _RateLimiter(AZURE_MAX_RPM) if AZURE_MAX_RPM > 0 else None
+
+
+@asynccontextmanager
+async def _azure_slot():
+    """Hold a request slot under the Azure concurrency and rate limits."""
+    if _az_limiter:
+        await _az_limiter.acquire()
+    async with _az_sem:
+        yield
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """
+    Return how long to wait before retrying a failed Azure call, or None if
+    the error is not transient.
+
+    Mirrors the SDK's retry policy: connection errors, timeouts and HTTP
+    408, 409, 429 and 5xx responses are retried, honoring Retry-After.
+    """
+    if isinstance(error, APIConnectionError):
+        retry_after = None
+    elif isinstance(error, APIStatusError) and (
+            error.status_code in (408, 409, 429) or error.status_code >= 500):
+        headers = error.response.headers
+        retry_after = None
+        try:
+            if headers.get("retry-after-ms"):
+                retry_after = float(headers["retry-after-ms"]) / 1000
+            elif headers.get("retry-after"):
+                retry_after = float(headers["retry-after"])
+        except ValueError:
+            pass
+    else:
+        return None
+
+    if retry_after is not None and 0 <= retry_after <= AZURE_RETRY_MAX_DELAY_S:
+        return retry_after
+    delay = AZURE_RETRY_BACKOFF_S * 2**attempt
+    return delay + random.uniform(0, delay)
+
+
+async def _call_azure(method, *args, **kwargs):
+    """Call an Azure OpenAI client method under the limits, retrying transient errors."""
+    for attempt in range(AZURE_RETRY_ATTEMPTS):
+        try:
+            async with _azure_slot():
+                return await method(*args, **kwargs)
+        except (APIConnectionError, APIStatusError) as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None or attempt == AZURE_RETRY_ATTEMPTS - 1:
+                raise
+            logger.warning("Azure OpenAI request failed, retrying in %.1fs: %s",
+                           delay, e)
+            await asyncio.sleep(delay)
+
+
+# Search results keyed by hashed normalized query, in LRU order. Each entry holds
+# (inserted_at, normalized query embedding or None, results).
+_search_cache: OrderedDict = OrderedDict()
+_semantic_cache_enabled = bool(AZURE_OPENAI_EMBEDDING_DEPLOYMENT)
+
+# Long-lived assistant ids keyed by kind ("search" or "fetch"), deleted on shutdown
+_assistant_ids: Dict[str, str] = {}
+
+# Filenames keyed by file id, in insertion order: file_id -> (filename, inserted_at)
+_filename_cache: OrderedDict = OrderedDict()
+_filenames_listed_at = 0.0
+_filename_refresh_task: Optional[asyncio.Task] = None
+
+
+def _cache_filename(file_id: str, filename: str) -> None:
+    """Store a filename, evicting the oldest entries past the size cap."""
+    _filename_cache.pop(file_id, None)
+    _filename_cache[file_id] = (filename, time.monotonic())
+    while len(_filename_cache) > FILENAME_CACHE_MAX_SIZE:
+        _filename_cache.popitem(last=False)
+
+
+async def _load_all_filenames() -> None:
+    """Fill the filename cache from the files listing, one request slot per page."""
+    try:
+        page = await _call_azure(azure_client.files.list)
+        while True:
+            for file_info in page.data:
+                if getattr(file_info, 'filename', None):
+                    _cache_filename(file_info.id, file_info.filename)
+            if not page.has_next_page():
+                break
+            page = await _call_azure(page.get_next_page)
+    except Exception as e:
+        logger.warning("Listing files for filename cache failed: %s", e)
+
+
+def _schedule_filename_refresh() -> None:
+    """Start a background files listing if the last one is older than FILENAME_LIST_REFRESH_S."""
+    global _filenames_listed_at, _filename_refresh_task
+
+    if time.monotonic() - _filenames_listed_at < FILENAME_LIST_REFRESH_S:
+        return
+    # Set before the listing finishes, and even if it fails, so a slow or
+    # broken listing is not restarted on every call
+    _filenames_listed_at = time.monotonic()
+    _filename_refresh_task = asyncio.create_task(_load_all_filenames())
+
+
+async def _cancel_filename_refresh() -> None:
+    """Stop an in-progress background files listing."""
+    if _filename_refresh_task and not _filename_refresh_task.done():
+        _filename_refresh_task.cancel()
+        await asyncio.gather(_filename_refresh_task, return_exceptions=True)
+
+
+async def _get_filename(file_id: str) -> Optional[str]:
+    """Return the filename of an uploaded file, using the metadata cache."""
+    _schedule_filename_refresh()
+
+    cached = _filename_cache.get(file_id)
+    if cached and time.monotonic() - cached[1] < FILENAME_CACHE_TTL_S:
+        return cached[0]
+
+    # Fall back to a point lookup for files not yet seen in a listing
+    file_info = await _call_azure(azure_client.files.retrieve, file_id)
+    filename = getattr(file_info, 'filename', None)
+    if filename:
+        _cache_filename(file_id, filename)
+    return filename
+
+
+# On-disk cache of extracted documents, opened on first use. sqlite3 calls
+# run in worker threads, so access to the shared connection is serialized.
+_fetch_cache_db: Optional[sqlite3.Connection] = None
+_fetch_cache_lock = threading.Lock()
+
+
+def _get_fetch_cache() -> sqlite3.Connection:
+    """Return the document cache connection, creating the table if needed."""
+    global _fetch_cache_db
+
+    if _fetch_cache_db is None:
+        _fetch_cache_db = sqlite3.connect(FETCH_CACHE_PATH,
+                                          check_same_thread=False)
+        _fetch_cache_db.execute("""CREATE TABLE IF NOT EXISTS files (
+                id TEXT NOT NULL,
+                vector_store_id TEXT NOT NULL,
+                title TEXT,
+                text TEXT,
+                inserted_at REAL,
+                PRIMARY KEY (id, vector_store_id))""")
+    return _fetch_cache_db
+
+
+def _read_cached_document(file_id: str) -> Optional[Tuple[str, str]]:
+    """Return the cached (title, text) of an extracted document, if still fresh."""
+    try:
+        with _fetch_cache_lock:
+            row = _get_fetch_cache().execute(
+                "SELECT title, text, inserted_at FROM files WHERE id = ? AND vector_store_id = ?",
+                (file_id, VECTOR_STORE_ID)).fetchone()
+    except sqlite3.Error as e:
+        logger.warning("Reading document cache for %s failed: %s", file_id, e)
+        return None
+
+    if row and time.time() - row[2] < FETCH_CACHE_TTL_S:
+        return row[0], row[1]
+    return None
+
+
+def _write_cached_document(file_id: str, title: str, text: str) -> None:
+    """Store the extracted content of a document."""
+    try:
+        with _fetch_cache_lock:
+            db = _get_fetch_cache()
+            db.execute(
+                "INSERT OR REPLACE INTO files (id, vector_store_id, title, text, inserted_at) VALUES (?, ?, ?, ?, ?)",
+                (file_id, VECTOR_STORE_ID, title, text, time.time()))
+            db.commit()
+    except sqlite3.Error as e:
+        logger.warning("Writing document cache for %s failed: %s", file_id, e)
+
+
+# Background cleanup tasks, referenced until done so they are not garbage collected
+_pending_tasks: set = set()
+
+
+async def _delete_thread(thread_id: str) -> None:
+    """Delete a temporary thread, logging rather than raising on failure."""
+    try:
+        await _call_azure(azure_client.beta.threads.delete, thread_id)
+    except Exception as e:
+        logger.warning("Cleanup of thread %s failed: %s", thread_id, e)
+
+
+def _schedule_thread_cleanup(thread_id: str) -> None:
+    """Delete a temporary thread in the background."""
+    task = asyncio.create_task(_delete_thread(thread_id))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
+
+
+async def _delete_assistants() -> None:
+    """Delete the long-lived assistants so restarts don't accumulate them."""
+    for kind, assistant_id in list(_assistant_ids.items()):
+        try:
+            await _call_azure(azure_client.beta.assistants.delete, assistant_id)
+        except Exception as e:
+            logger.warning("Deleting %s assistant %s failed: %s", kind,
+                           assistant_id, e)
+        _assistant_ids.pop(kind, None)
+
+
+async def _drain_pending_tasks() -> None:
+    """Wait for outstanding background cleanup tasks to finish."""
+    if _pending_tasks:
+        await asyncio.gather(*_pending_tasks, return_exceptions=True)
+
+
+def _snippet(text: str, limit: int = 200) -> str:
+    """Truncate text to at most `limit` characters, marking the cut with an ellipsis."""
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _search_cache_key(query: str) -> str:
+    """Hash a whitespace- and case-normalized query into a search cache key."""
+    return hashlib.blake2b(" ".join(query.lower().split()).encode(),
+                           digest_size=16).hexdigest()
+
+
+def _get_recent_search(key: str) -> Optional[Dict[str, Any]]:
+    """Return cached results stored within SEARCH_SHORT_TTL_S, skipping the expiry scan."""
+    cached = _search_cache.get(key)
+    if cached and time.monotonic() - cached[0] < SEARCH_SHORT_TTL_S:
+        return cached[2]
+    return None
+
+
+async def _embed_query(query: str) -> Optional[List[float]]:
+    """Return the L2-normalized embedding of a query, or None if unavailable."""
+    global _semantic_cache_enabled
+
+    if not _semantic_cache_enabled:
+        return None
+    try:
+        response = await _call_azure(
+            azure_client.embeddings.create,
+            model=AZURE_OPENAI_EMBEDDING_DEPLOYMENT, input=query)
+    except NotFoundError as e:
+        logger.warning(
+            "Embedding deployment %s not found, semantic cache disabled: %s",
+            AZURE_OPENAI_EMBEDDING_DEPLOYMENT, e)
+        _semantic_cache_enabled = False
+        return None
+    except Exception as e:
+        logger.warning("Query embedding failed, semantic cache skipped: %s", e)
+        return None
+
+    embedding = response.data[0].embedding
+    norm = math.sqrt(sum(x * x for x in embedding))
+    return [x / norm for x in embedding] if norm else None
+
+
+def _get_cached_search(key: str) -> Optional[Dict[str, Any]]:
+    """Look up cached search results for an exact query key."""
+    now = time.monotonic()
+    for cached_key in [
+            k for k, (inserted_at, _, _) in _search_cache.items()
+            if now - inserted_at >= SEARCH_CACHE_TTL_S
+    ]:
+        del _search_cache[cached_key]
+
+    if key in _search_cache:
+        _search_cache.move_to_end(key)
+        return _search_cache[key][2]
+    return None
+
+
+def _most_similar_query(
+        embedding: List[float],
+        candidates: List[Tuple[str, List[float]]]) -> Optional[str]:
+    """Return the candidate key whose embedding is most similar above SEARCH_CACHE_SIMILARITY."""
+    best_key, best_score = None, SEARCH_CACHE_SIMILARITY
+    for cached_key, cached_embedding in candidates:
+        score = sum(a * b for a, b in zip(embedding, cached_embedding))
+        if score >= best_score:
+            best_key, best_score = cached_key, score
+    return best_key
+
+
+async def _get_similar_search(
+        embedding: List[float]) -> Optional[Dict[str, Any]]:
+    """Look up cached search results for the most similar cached query."""
+    candidates = [(k, cached_embedding)
+                  for k, (_, cached_embedding, _) in _search_cache.items()
+                  if cached_embedding is not None]
+    if not candidates:
+        return None
+
+    # The similarity scan is CPU-bound, so keep it off the event loop
+    best_key = await asyncio.to_thread(_most_similar_query, embedding,
+                                       candidates)
+    if best_key is None or best_key not in _search_cache:
+        return None
+    _search_cache.move_to_end(best_key)
+    return _search_cache[best_key][2]
+
+
+def _cache_search(key: str, embedding: Optional[List[float]],
+                  results: Dict[str, Any]) -> None:
+    """Store search results, evicting the least recently used entries."""
+    _search_cache[key] = (time.monotonic(), embedding, results)
+    _search_cache.move_to_end(key)
+    while len(_search_cache) > SEARCH_CACHE_MAX_SIZE:
+        _search_cache.popitem(last=False)
+
+
 server_instructions = """
 This MCP server provides search and document retrieval capabilities 
 for deep research using Azure OpenAI. Use the search tool to find relevant documents 
@@ -39,18 +456,349 @@ based on keywords, then use the fetch tool to retrieve complete
 document content with citations.
 """
 
+extractor_instructions = """You are a document content extractor. When asked to retrieve the full content of a specific file, 
+you should return the complete text content of that file in a structured format. 
+Extract all text content including headers, paragraphs, lists, and any other textual information.
+Do not summarize - provide the full content."""
+
+
+def _serialize_tool_result(data: Any) -> str:
+    """Encode a tool result as JSON with orjson."""
+    return orjson.dumps(data, default=str).decode()
+
 
 def create_server():
     """Create and configure the MCP server with search and fetch tools."""
 
     # Initialize the FastMCP server
     mcp = FastMCP(name="Azure OpenAI Deep Research MCP Server",
-                  instructions=server_instructions)
+                  instructions=server_instructions,
+                  tool_serializer=_serialize_tool_result if orjson else None)
+
+    # Assistants are created once on first use and reused across calls;
+    # only the per-query thread is created and deleted on each request.
+    assistant_specs = {
+        "search": {
+            "name": "MCP Search Assistant"
+        },
+        "fetch": {
+            "name": "MCP Content Extractor",
+            "instructions": extractor_instructions
+        },
+    }
+    assistant_lock = asyncio.Lock()
+
+    async def get_assistant_id(kind: str, stale_id: Optional[str] = None) -> str:
+        """
+        Return the id of the long-lived assistant for `kind`, creating it if needed.
+
+        Passing the `stale_id` that Azure reported as missing recreates the
+        assistant, unless a concurrent caller has already replaced it.
+        """
+        async with assistant_lock:
+            if kind not in _assistant_ids or _assistant_ids[kind] == stale_id:
+                assistant = await _call_azure(
+                    azure_client.beta.assistants.create,
+                    model=AZURE_OPENAI_DEPLOYMENT_NAME,
+                    tools=[{
+                        "type": "file_search"
+                    }],
+                    tool_resources={
+                        "file_search": {
+                            "vector_store_ids": [VECTOR_STORE_ID]
+                        }
+                    },
+                    **assistant_specs[kind])
+                _assistant_ids[kind] = assistant.id
+                logger.info("Created %s assistant: %s", kind, assistant.id)
+            return _assistant_ids[kind]
+
+    async def run_thread(kind: str, thread_id: str):
+        """Run a thread on the shared assistant, recreating it if it was deleted."""
+        assistant_id = await get_assistant_id(kind)
+        try:
+            run = await _call_azure(
+                azure_client.beta.threads.runs.create,
+                thread_id=thread_id, assistant_id=assistant_id)
+        except NotFoundError:
+            logger.warning("%s assistant not found - recreating it", kind)
+            run = await _call_azure(
+                azure_client.beta.threads.runs.create,
+                thread_id=thread_id,
+                assistant_id=await get_assistant_id(kind, stale_id=assistant_id))
+
+        # Poll with exponential backoff so short runs are picked up quickly
+        delay = RUN_POLL_INITIAL_S
+        while run.status not in RUN_TERMINAL_STATUSES:
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.5, RUN_POLL_MAX_S)
+            run = await _call_azure(
+                azure_client.beta.threads.runs.retrieve,
+                thread_id=thread_id, run_id=run.id)
+
+        if run.status in ("failed", "cancelled", "expired"):
+            raise ValueError(
+                f"Run {run.id} {run.status}: {getattr(run, 'last_error', None)}")
+        return run
+
+    async def stream_thread(kind: str, thread_id: str) -> Tuple[str, str]:
+        """Stream a run on the shared assistant and return its (text, final status)."""
+
+        async def consume(assistant_id: str) -> Tuple[str, str]:
+            for attempt in range(AZURE_RETRY_ATTEMPTS):
+                content_parts = []
+                try:
+                    async with _azure_slot(), azure_client.beta.threads.runs.stream(
+                            thread_id=thread_id,
+                            assistant_id=assistant_id) as stream:
+                        async for delta in stream.text_deltas:
+                            content_parts.append(delta)
+                        run = stream.current_run
+                    break
+                except RateLimitError as e:
+                    # A rejected stream created no run, so it is safe to retry
+                    # as long as nothing has been received; the slot is
+                    # released before sleeping
+                    if content_parts or attempt == AZURE_RETRY_ATTEMPTS - 1:
+                        raise
+                    delay = _retry_delay(e, attempt)
+                    logger.warning(
+                        "Azure OpenAI stream rate limited, retrying in %.1fs: %s",
+                        delay, e)
+                    await asyncio.sleep(delay)
+
+            if run and run.status in ("failed", "cancelled", "expired"):
+                raise ValueError(
+                    f"Run {run.id} {run.status}: {getattr(run, 'last_error', None)}"
+                )
+            return "".join(content_parts), run.status if run else "unknown"
+
+        assistant_id = await get_assistant_id(kind)
+        try:
+            return await consume(assistant_id)
+        except NotFoundError:
+            logger.warning("%s assistant not found - recreating it", kind)
+            return await consume(
+                await get_assistant_id(kind, stale_id=assistant_id))
+
+    async def search_with_responses(
+            query: str) -> List[Tuple[str, List[Dict[str, str]]]]:
+        """Run a file search in a single Responses API call."""
+        response = await _call_azure(
+            azure_client.responses.create,
+            model=AZURE_OPENAI_DEPLOYMENT_NAME,
+            input=
+            f"Search for information about: {query}. Please provide specific details and cite sources.",
+            tools=[{
+                "type": "file_search",
+                "vector_store_ids": [VECTOR_STORE_ID]
+            }],
+            tool_choice={"type": "file_search"})
+
+        text_items = []
+        for output_item in response.output:
+            if output_item.type != "message":
+                continue
+            for content_item in output_item.content:
+                if content_item.type != "output_text":
+                    continue
+                text_content = content_item.text
+
+                # The annotation index marks where the citation occurs, so
+                # the text leading up to it serves as the quote
+                citations = []
+                for annotation in content_item.annotations or []:
+                    if annotation.type == "file_citation":
+                        citations.append({
+                            "file_id":
+                            annotation.file_id,
+                            "filename":
+                            getattr(annotation, 'filename', None),
+                            "quote":
+                            text_content[max(0, annotation.index -
+                                             200):annotation.index].strip()
+                        })
+                text_items.append((text_content, citations))
+        return text_items
+
+    async def search_with_assistants(
+            query: str) -> List[Tuple[str, List[Dict[str, str]]]]:
+        """Run a file search through a thread on the shared search assistant."""
+        # Create thread with the search query
+        thread = await _call_azure(
+            azure_client.beta.threads.create,
+            messages=[{
+                "role":
+                "user",
+                "content":
+                f"Search for information about: {query}. Please provide specific details and cite sources."
+            }],
+            tool_resources={
+                "file_search": {
+                    "vector_store_ids": [VECTOR_STORE_ID]
+                }
+            })
+
+        try:
+            # Run the search
+            run = await run_thread("search", thread.id)
+
+            # Get the assistant's response with citations
+            messages = await _call_azure(
+                azure_client.beta.threads.messages.list,
+                thread_id=thread.id)
+
+            text_items = []
+
+            if messages.data:
+                assistant_message = messages.data[
+                    0]  # Latest message from assistant
+
+                # Extract text content and citations
+                if hasattr(assistant_message,
+                           'content') and assistant_message.content:
+                    for content_item in assistant_message.content:
+                        if hasattr(content_item, 'text'):
+                            text_content = content_item.text.value
+
+                            # Extract citations if available
+                            citations = []
+                            if hasattr(content_item.text, 'annotations'):
+                                for annotation in content_item.text.annotations:
+                                    if hasattr(annotation, 'file_citation'):
+                                        citation = annotation.file_citation
+                                        citations.append({
+                                            "file_id":
+                                            citation.file_id,
+                                            "quote":
+                                            getattr(citation, 'quote', '')
+                                        })
+                            text_items.append((text_content, citations))
+        finally:
+            # Cleanup - delete temporary thread without delaying the response
+            _schedule_thread_cleanup(thread.id)
+
+        return text_items
+
+    async def build_results(
+        text_items: List[Tuple[str, List[Dict[str, str]]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Create one result entry per cited file across all text items, plus
+        one for the content of each text item without citations.
+        """
+        results = []
+
+        # Group citations from every text item by file so each document
+        # appears once per response
+        unique: OrderedDict = OrderedDict()
+        for _, citations in text_items:
+            for citation in citations:
+                entry = unique.setdefault(citation["file_id"], {
+                    "filename": None,
+                    "quotes": []
+                })
+                entry["filename"] = entry["filename"] or citation.get(
+                    "filename")
+                entry["quotes"].append(citation["quote"])
+
+        if unique:
+
+            # Get file info for better titles, one concurrent lookup per file
+            file_ids = [
+                file_id for file_id, entry in unique.items()
+                if not entry["filename"]
+            ]
+            lookups = await asyncio.gather(
+                *(_get_filename(file_id) for file_id in file_ids),
+                return_exceptions=True)
+            filenames = {
+                file_id: filename
+                for file_id, filename in zip(file_ids, lookups)
+                if not isinstance(filename, BaseException)
+            }
+
+            for i, (file_id, entry) in enumerate(unique.items()):
+                title = entry["filename"] or filenames.get(
+                    file_id) or f"Document {i+1}"
+
+                snippet = _snippet(max(entry["quotes"], key=len))
+
+                results.append({
+                    "id":
+                    file_id,
+                    "title":
+                    title,
+                    "text":
+                    snippet,
+                    "url":
+                    f"https://{AZURE_OPENAI_HOST}/openai/files/{file_id}"
+                })
+
+        for text_content, citations in text_items:
+            if citations:
+                continue
+            # No specific citations, use general response
+            snippet = _snippet(text_content)
+            results.append({
+                "id":
+                "search_result_1",
+                "title":
+                "Search Results",
+                "text":
+                snippet,
+                "url":
+                f"https://{AZURE_OPENAI_HOST}/openai/vector_stores/{VECTOR_STORE_ID}"
+            })
+
+        return results
+
+    async def extract_document(file_id: str) -> Tuple[str, str, bool]:
+        """
+        Extract a file's content through the shared extractor assistant.
+
+        Returns (title, text, complete), where `complete` is False when the run
+        stopped early (e.g. at the output token limit) and the text is truncated.
+        """
+        # First, get file metadata to get the filename
+        try:
+            filename = await _get_filename(file_id) or f"Document {file_id}"
+        except Exception as e:
+            logger.warning(
+                "Could not retrieve file metadata for %s: %s", file_id, e)
+            filename = f"Document {file_id}"
+
+        # Create thread asking for full document content
+        thread = await _call_azure(
+            azure_client.beta.threads.create,
+            messages=[{
+                "role":
+                "user",
+                "content":
+                f"""Please extract and return the complete full text content from the file with ID: {file_id} 
+                (filename: {filename}). I need the entire document content, not a summary. 
+                Return all text including headers, sections, paragraphs, lists, tables, and any other content.
+                Structure the output clearly but include everything from the document."""
+            }],
+            tool_resources={
+                "file_search": {
+                    "vector_store_ids": [VECTOR_STORE_ID]
+                }
+            })
+
+        try:
+            # Run the content extraction, collecting text as it is generated
+            file_content, status = await stream_thread("fetch", thread.id)
+        finally:
+            # Cleanup - delete temporary thread without delaying the response
+            _schedule_thread_cleanup(thread.id)
+
+        return filename, file_content, status == "completed"
 
     @mcp.tool()
     async def search(query: str) -> Dict[str, List[Dict[str, Any]]]:
         """
-        Search for documents using Azure OpenAI Vector Store through Assistants API.
+        Search for documents using Azure OpenAI Vector Store through the file_search tool.
 
         This tool searches through the vector store to find semantically relevant matches
         using Azure OpenAI's enhanced file search capabilities with hybrid search,
@@ -80,128 +828,44 @@ def create_server():
                 "AZURE_OPENAI_DEPLOYMENT_NAME environment variable is required"
             )
 
-        # Search using Azure OpenAI Assistants API with file_search tool
+        # Answer immediate repeats straight from the cache
+        cache_key = _search_cache_key(query)
+        cached = _get_recent_search(cache_key)
+        if cached is not None:
+            logger.info("Recent search hit for query: '%s'", query)
+            return cached
+
+        # Serve repeated and paraphrased queries from the cache
+        cached = _get_cached_search(cache_key)
+        if cached is None:
+            query_embedding = await _embed_query(query)
+            if query_embedding is not None:
+                cached = await _get_similar_search(query_embedding)
+        if cached is not None:
+            logger.info("Search cache hit for query: '%s'", query)
+            return cached
+
+        # Search the vector store with the file_search tool
         logger.info(
-            f"Searching Azure OpenAI vector store {VECTOR_STORE_ID} for query: '{query}'"
+            "Searching Azure OpenAI vector store %s for query: '%s'",
+            VECTOR_STORE_ID, query
         )
 
         try:
-            # Create a temporary assistant for search
-            assistant = azure_client.beta.assistants.create(
-                name="MCP Search Assistant",
-                model=AZURE_OPENAI_DEPLOYMENT_NAME,
-                tools=[{
-                    "type": "file_search"
-                }],
-                tool_resources={
-                    "file_search": {
-                        "vector_store_ids": [VECTOR_STORE_ID]
-                    }
-                })
-
-            # Create thread with the search query
-            thread = azure_client.beta.threads.create(
-                messages=[{
-                    "role":
-                    "user",
-                    "content":
-                    f"Search for information about: {query}. Please provide specific details and cite sources."
-                }],
-                tool_resources={
-                    "file_search": {
-                        "vector_store_ids": [VECTOR_STORE_ID]
-                    }
-                })
-
-            # Run the search
-            run = azure_client.beta.threads.runs.create_and_poll(
-                thread_id=thread.id, assistant_id=assistant.id)
-
-            # Get the assistant's response with citations
-            messages = azure_client.beta.threads.messages.list(
-                thread_id=thread.id)
-
-            results = []
-
-            if messages.data:
-                assistant_message = messages.data[
-                    0]  # Latest message from assistant
+            if USE_RESPONSES_API:
+                text_items = await search_with_responses(query)
+            else:
+                text_items = await search_with_assistants(query)
 
-                # Extract text content and citations
-                if hasattr(assistant_message,
-                           'content') and assistant_message.content:
-                    for content_item in assistant_message.content:
-                        if hasattr(content_item, 'text'):
-                            text_content = content_item.text.value
+            results = await build_results(text_items)
 
-                            # Extract citations if available
-                            citations = []
-                            if hasattr(content_item.text, 'annotations'):
-                                for annotation in content_item.text.annotations:
-                                    if hasattr(annotation, 'file_citation'):
-                                        citation = annotation.file_citation
-                                        citations.append({
-                                            "file_id":
-                                            citation.file_id,
-                                            "quote":
-                                            getattr(citation, 'quote', '')
-                                        })
-
-                            # Create result entries for each citation or main content
-                            if citations:
-                                for i, citation in enumerate(citations):
-                                    # Get file info for better title
-                                    try:
-                                        file_info = azure_client.files.retrieve(
-                                            citation["file_id"])
-                                        title = getattr(
-                                            file_info, 'filename',
-                                            f"Document {i+1}")
-                                    except:
-                                        title = f"Document {i+1}"
-
-                                    snippet = citation[
-                                        "quote"][:200] + "..." if len(
-                                            citation["quote"]
-                                        ) > 200 else citation["quote"]
-
-                                    results.append({
-                                        "id":
-                                        citation["file_id"],
-                                        "title":
-                                        title,
-                                        "text":
-                                        snippet,
-                                        "url":
-                                        f"https://{AZURE_OPENAI_ENDPOINT.split('//')[1]}/openai/files/{citation['file_id']}"
-                                    })
-                            else:
-                                # No specific citations, use general response
-                                snippet = text_content[:200] + "..." if len(
-                                    text_content) > 200 else text_content
-                                results.append({
-                                    "id":
-                                    "search_result_1",
-                                    "title":
-                                    "Search Results",
-                                    "text":
-                                    snippet,
-                                    "url":
-                                    f"https://{AZURE_OPENAI_ENDPOINT.split('//')[1]}/openai/vector_stores/{VECTOR_STORE_ID}"
-                                })
-
-            # Cleanup - delete temporary assistant
-            try:
-                azure_client.beta.assistants.delete(assistant.id)
-                azure_client.beta.threads.delete(thread.id)
-            except:
-                pass  # Continue even if cleanup fails
-
-            logger.info(f"Azure OpenAI search returned {len(results)} results")
-            return {"results": results}
+            logger.info("Azure OpenAI search returned %d results", len(results))
+            search_results = {"results": results}
+            _cache_search(cache_key, query_embedding, search_results)
+            return search_results
 
         except Exception as e:
-            logger.error(f"Azure OpenAI search failed: {e}")
+            logger.error("Azure OpenAI search failed: %s", e)
             raise ValueError(f"Search operation failed: {str(e)}")
 
     @mcp.tool()
@@ -241,92 +905,29 @@ def create_server():
             )
 
         logger.info(
-            f"Fetching content from Azure OpenAI vector store for file ID: {id}"
+            "Fetching content from Azure OpenAI vector store for file ID: %s",
+            id
         )
 
         try:
-            # First, get file metadata to get the filename
-            try:
-                file_info = azure_client.files.retrieve(id)
-                filename = getattr(file_info, 'filename', f"Document {id}")
-            except Exception as e:
-                logger.warning(
-                    f"Could not retrieve file metadata for {id}: {e}")
-                filename = f"Document {id}"
-
-            # Create a temporary assistant for content extraction
-            assistant = azure_client.beta.assistants.create(
-                name="MCP Content Extractor",
-                model=AZURE_OPENAI_DEPLOYMENT_NAME,
-                tools=[{
-                    "type": "file_search"
-                }],
-                tool_resources={
-                    "file_search": {
-                        "vector_store_ids": [VECTOR_STORE_ID]
-                    }
-                },
-                instructions=
-                """You are a document content extractor. When asked to retrieve the full content of a specific file, 
-                you should return the complete text content of that file in a structured format. 
-                Extract all text content including headers, paragraphs, lists, and any other textual information.
-                Do not summarize - provide the full content.""")
-
-            # Create thread asking for full document content
-            thread = azure_client.beta.threads.create(
-                messages=[{
-                    "role":
-                    "user",
-                    "content":
-                    f"""Please extract and return the complete full text content from the file with ID: {id} 
-                    (filename: {filename}). I need the entire document content, not a summary. 
-                    Return all text including headers, sections, paragraphs, lists, tables, and any other content.
-                    Structure the output clearly but include everything from the document."""
-                }],
-                tool_resources={
-                    "file_search": {
-                        "vector_store_ids": [VECTOR_STORE_ID]
-                    }
-                })
-
-            # Run the content extraction
-            run = azure_client.beta.threads.runs.create_and_poll(
-                thread_id=thread.id, assistant_id=assistant.id)
-
-            # Get the assistant's response with full content
-            messages = azure_client.beta.threads.messages.list(
-                thread_id=thread.id)
-
-            file_content = "No content available"
-
-            if messages.data:
-                assistant_message = messages.data[
-                    0]  # Latest message from assistant
-
-                # Extract text content
-                if hasattr(assistant_message,
-                           'content') and assistant_message.content:
-                    content_parts = []
-                    for content_item in assistant_message.content:
-                        if hasattr(content_item, 'text'):
-                            content_parts.append(content_item.text.value)
-
-                    if content_parts:
-                        file_content = "\n".join(content_parts)
-
-            # Cleanup - delete temporary assistant and thread
-            try:
-                azure_client.beta.assistants.delete(assistant.id)
-                azure_client.beta.threads.delete(thread.id)
-            except Exception as cleanup_error:
-                logger.warning(f"Cleanup failed: {cleanup_error}")
+            # Serve previously extracted documents from the on-disk cache
+            cached = await asyncio.to_thread(_read_cached_document, id)
+            if cached is not None:
+                filename, file_content = cached
+                logger.info("Serving cached content for file: %s", id)
+            else:
+                filename, file_content, complete = await extract_document(id)
+                # Truncated extractions are returned but never cached
+                if file_content and complete:
+                    await asyncio.to_thread(_write_cached_document, id,
+                                            filename, file_content)
 
             result = {
                 "id": id,
                 "title": filename,
-                "text": file_content,
+                "text": file_content or "No content available",
                 "url":
-                f"https://{AZURE_OPENAI_ENDPOINT.split('//')[1]}/openai/files/{id}",
+                f"https://{AZURE_OPENAI_HOST}/openai/files/{id}",
                 "metadata": {
                     "extraction_method":
                     "assistants_api",
@@ -336,16 +937,43 @@ def create_server():
             }
 
             logger.info(
-                f"Successfully extracted content from Azure OpenAI file: {id}")
+                "Successfully extracted content from Azure OpenAI file: %s", id)
             return result
 
         except Exception as e:
-            logger.error(f"Failed to fetch file {id}: {e}")
+            logger.error("Failed to fetch file %s: %s", id, e)
             raise ValueError(f"File content extraction failed: {str(e)}")
 
     return mcp
 
 
+async def warmup_connections() -> None:
+    """Open keep-alive connections to the Azure endpoint ahead of the first request."""
+    url = f"{AZURE_OPENAI_ENDPOINT.rstrip('/')}/openai/models?api-version={AZURE_OPENAI_API_VERSION}"
+    responses = await asyncio.gather(
+        *(http_client.head(url, headers={"api-key": AZURE_OPENAI_API_KEY})
+          for _ in range(HTTP_WARMUP_CONNECTIONS)),
+        return_exceptions=True)
+
+    # Only the handshakes matter, so non-2xx responses are fine
+    warmed = sum(1 for r in responses if not isinstance(r, BaseException))
+    logger.info("Warmed up %d/%d connections", warmed, HTTP_WARMUP_CONNECTIONS)
+
+
+async def run_server(server: FastMCP) -> None:
+    """Run the MCP server and release pooled Azure connections on shutdown."""
+    try:
+        await warmup_connections()
+
+        # Use FastMCP's built-in async run method with SSE transport
+        await server.run_async(transport="sse", host="0.0.0.0", port=8000)
+    finally:
+        await _cancel_filename_refresh()
+        await _drain_pending_tasks()
+        await _delete_assistants()
+        await http_client.aclose()
+
+
 def main():
     """Main function to start the MCP server."""
     # Verify Azure OpenAI client is initialized
@@ -362,9 +990,9 @@ def main():
         )
         raise ValueError("Azure OpenAI deployment name is required")
 
-    logger.info(f"Using Azure OpenAI endpoint: {AZURE_OPENAI_ENDPOINT}")
-    logger.info(f"Using deployment: {AZURE_OPENAI_DEPLOYMENT_NAME}")
-    logger.info(f"Using vector store: {VECTOR_STORE_ID}")
+    logger.info("Using Azure OpenAI endpoint: %s", AZURE_OPENAI_ENDPOINT)
+    logger.info("Using deployment: %s", AZURE_OPENAI_DEPLOYMENT_NAME)
+    logger.info("Using vector store: %s", VECTOR_STORE_ID)
 
     # Create the MCP server
     server = create_server()
@@ -374,12 +1002,11 @@ def main():
     logger.info("Server will be accessible via SSE transport")
 
     try:
-        # Use FastMCP's built-in run method with SSE transport
-        server.run(transport="sse", host="0.0.0.0", port=8000)
+        asyncio.run(run_server(server))
     except KeyboardInterrupt:
         logger.info("Server stopped by user")
     except Exception as e:
-        logger.error(f"Server error: {e}")
+        logger.error("Server error: %s", e)
         raise
 
 
@@ -7,45 +7,13 @@ import asyncio
 import os
 import main
 
-async def validate_azure_mcp_server():
-    """Complete validation of Azure OpenAI MCP server functionality"""
-
-    print("Azure OpenAI MCP Server Validation")
-    print("=" * 35)
-
-    # Verify environment variables first
-    print("0. Checking environment variables...")
-    required_vars = [
-        "AZURE_OPENAI_API_KEY",
-        "AZURE_OPENAI_ENDPOINT", 
-        "AZURE_OPENAI_DEPLOYMENT_NAME",
-        "VECTOR_STORE_ID"
-    ]
-
-    missing_vars = []
-    for var in required_vars:
-        if not os.environ.get(var):
-            missing_vars.append(var)
-
-    if missing_vars:
-        print(f"   ✗ Missing environment variables: {', '.join(missing_vars)}")
-        print("   Please set the following:")
-        for var in missing_vars:
-            print(f"     export {var}=your_value")
-        return False
-    else:
-        print("   ✓ All required environment variables are set")
-        print(f"     Endpoint: {os.environ.get('AZURE_OPENAI_ENDPOINT')}")
-        print(f"     Deployment: {os.environ.get('AZURE_OPENAI_DEPLOYMENT_NAME')}")
-        print(f"     Vector Store: {os.environ.get('VECTOR_STORE_ID')}")
-
-    server = main.create_server()
-
-    # Test 1: List tools
-    print("\n1. Testing list_tools...")
+async def _test_list_tools(server):
+    """Test 1: List tools"""
+    name = "1. Testing list_tools..."
+    lines = []
     try:
         tools = await server._list_tools()
-        print(f"   Tools found: {len(tools)}")
+        lines.append(f"   Tools found: {len(tools)}")
 
         tool_data = []
         for tool in tools:
@@ -55,45 +23,54 @@ async def validate_azure_mcp_server():
                 "has_schema": hasattr(tool, 'input_schema')
             }
             tool_data.append(data)
-            print(f"   - {tool.name}: {tool.description[:50]}...")
+            lines.append(f"   - {tool.name}: {tool.description[:50]}...")
 
         # Verify expected tools
         names = [t["name"] for t in tool_data]
         if "search" in names and "fetch" in names:
-            print("   ✓ Both required tools present")
+            lines.append("   ✓ Both required tools present")
         else:
-            print(f"   ✗ Missing tools. Found: {names}")
+            lines.append(f"   ✗ Missing tools. Found: {names}")
 
     except Exception as e:
-        print(f"   ✗ List tools failed: {e}")
-        return False
+        lines.append(f"   ✗ List tools failed: {e}")
+        return name, False, lines
 
-    # Test 2: Test Azure OpenAI client connectivity
-    print("\n2. Testing Azure OpenAI client connectivity...")
+    return name, True, lines
+
+async def _test_client_connectivity():
+    """Test 2: Test Azure OpenAI client connectivity"""
+    name = "2. Testing Azure OpenAI client connectivity..."
+    lines = []
     try:
         if main.azure_client:
             # Test basic API connectivity by listing models/deployments
             try:
                 # Test with a simple API call
-                models = main.azure_client.models.list()
-                print(f"   ✓ Azure OpenAI client connected successfully")
-                print(f"     Available models: {len(list(models.data)) if hasattr(models, 'data') else 'N/A'}")
+                models = await main._call_azure(main.azure_client.models.list)
+                lines.append(f"   ✓ Azure OpenAI client connected successfully")
+                lines.append(f"     Available models: {len(models.data) if hasattr(models, 'data') else 'N/A'}")
             except Exception as e:
-                print(f"   ! Client connected but API call failed: {e}")
-                print("     This might be normal if your deployment doesn't support model listing")
+                lines.append(f"   ! Client connected but API call failed: {e}")
+                lines.append("     This might be normal if your deployment doesn't support model listing")
         else:
-            print("   ✗ Azure OpenAI client not initialized")
-            return False
+            lines.append("   ✗ Azure OpenAI client not initialized")
+            return name, False, lines
     except Exception as e:
-        print(f"   ✗ Azure OpenAI client test failed: {e}")
-        return False
+        lines.append(f"   ✗ Azure OpenAI client test failed: {e}")
+        return name, False, lines
+
+    return name, True, lines
 
-    # Test 3: Test search tool with Assistant API
-    print("\n3. Testing search tool with Azure OpenAI Assistants API...")
+async def _test_assistants():
+    """Test 3: Test search tool with Assistant API"""
+    name = "3. Testing search tool with Azure OpenAI Assistants API..."
+    lines = []
     try:
         if main.azure_client and main.AZURE_OPENAI_DEPLOYMENT_NAME:
             # Test creating an assistant first
-            test_assistant = main.azure_client.beta.assistants.create(
+            test_assistant = await main._call_azure(
+                main.azure_client.beta.assistants.create,
                 name="Test Assistant",
                 model=main.AZURE_OPENAI_DEPLOYMENT_NAME,
                 tools=[{"type": "file_search"}],
@@ -104,10 +81,11 @@ async def validate_azure_mcp_server():
                 } if main.VECTOR_STORE_ID else {}
             )
 
-            print(f"   ✓ Successfully created test assistant: {test_assistant.id}")
+            lines.append(f"   ✓ Successfully created test assistant: {test_assistant.id}")
 
             # Test thread creation
-            test_thread = main.azure_client.beta.threads.create(
+            test_thread = await main._call_azure(
+                main.azure_client.beta.threads.create,
                 messages=[{
                     "role": "user",
                     "content": "Test search query"
@@ -119,38 +97,45 @@ async def validate_azure_mcp_server():
                 } if main.VECTOR_STORE_ID else {}
             )
 
-            print(f"   ✓ Successfully created test thread: {test_thread.id}")
+            lines.append(f"   ✓ Successfully created test thread: {test_thread.id}")
 
             # Cleanup test objects
             try:
-                main.azure_client.beta.assistants.delete(test_assistant.id)
-                main.azure_client.beta.threads.delete(test_thread.id)
-                print("   ✓ Test objects cleaned up successfully")
+                await main._call_azure(main.azure_client.beta.assistants.delete, test_assistant.id)
+                await main._call_azure(main.azure_client.beta.threads.delete, test_thread.id)
+                lines.append("   ✓ Test objects cleaned up successfully")
             except Exception as cleanup_error:
-                print(f"   ! Cleanup warning: {cleanup_error}")
+                lines.append(f"   ! Cleanup warning: {cleanup_error}")
 
         else:
-            print("   ✗ Azure OpenAI client or deployment name not available")
+            lines.append("   ✗ Azure OpenAI client or deployment name not available")
+            return name, False, lines
     except Exception as e:
-        print(f"   ✗ Search tool test failed: {e}")
-        print(f"     This could indicate issues with your deployment or vector store configuration")
+        lines.append(f"   ✗ Search tool test failed: {e}")
+        lines.append(f"     This could indicate issues with your deployment or vector store configuration")
+        return name, False, lines
 
-    # Test 4: Test vector store access
-    print("\n4. Testing vector store access...")
+    return name, True, lines
+
+async def _test_vector_store():
+    """Test 4: Test vector store access"""
+    name = "4. Testing vector store access..."
+    lines = []
     try:
         if main.azure_client and main.VECTOR_STORE_ID:
             # Try to retrieve vector store info
             try:
-                vector_store = main.azure_client.beta.vector_stores.retrieve(main.VECTOR_STORE_ID)
-                print(f"   ✓ Vector store accessible: {vector_store.name if hasattr(vector_store, 'name') else 'Unnamed'}")
+                vector_store = await main._call_azure(main.azure_client.beta.vector_stores.retrieve, main.VECTOR_STORE_ID)
+                lines.append(f"   ✓ Vector store accessible: {vector_store.name if hasattr(vector_store, 'name') else 'Unnamed'}")
 
                 # List files in vector store
-                files = main.azure_client.beta.vector_stores.files.list(
+                files = await main._call_azure(
+                    main.azure_client.beta.vector_stores.files.list,
                     vector_store_id=main.VECTOR_STORE_ID,
                     limit=5
                 )
-                file_count = len(list(files.data)) if hasattr(files, 'data') else 0
-                print(f"   ✓ Found {file_count} files in vector store")
+                file_count = len(files.data) if hasattr(files, 'data') else 0
+                lines.append(f"   ✓ Found {file_count} files in vector store")
 
                 if file_count > 0 and hasattr(files, 'data'):
                     # Test fetch with first file
@@ -158,20 +143,85 @@ async def validate_azure_mcp_server():
                     file_id = first_file.id
 
                     try:
-                        file_info = main.azure_client.beta.vector_stores.files.retrieve(
+                        file_info = await main._call_azure(
+                            main.azure_client.beta.vector_stores.files.retrieve,
                             vector_store_id=main.VECTOR_STORE_ID,
                             file_id=file_id
                         )
-                        print(f"   ✓ Successfully retrieved file info for: {file_id}")
+                        lines.append(f"   ✓ Successfully retrieved file info for: {file_id}")
                     except Exception as fetch_error:
-                        print(f"   ! File fetch test failed: {fetch_error}")
+                        lines.append(f"   ! File fetch test failed: {fetch_error}")
 
             except Exception as vs_error:
-                print(f"   ✗ Vector store access failed: {vs_error}")
+                lines.append(f"   ✗ Vector store access failed: {vs_error}")
+                return name, False, lines
         else:
-            print("   ✗ Azure OpenAI client or vector store ID not available")
+            lines.append("   ✗ Azure OpenAI client or vector store ID not available")
+            return name, False, lines
     except Exception as e:
-        print(f"   ✗ Vector store test failed: {e}")
+        lines.append(f"   ✗ Vector store test failed: {e}")
+        return name, False, lines
+
+    return name, True, lines
+
+async def validate_azure_mcp_server():
+    """Complete validation of Azure OpenAI MCP server functionality"""
+
+    print("Azure OpenAI MCP Server Validation")
+    print("=" * 35)
+
+    # Verify environment variables first
+    print("0. Checking environment variables...")
+    required_vars = [
+        "AZURE_OPENAI_API_KEY",
+        "AZURE_OPENAI_ENDPOINT", 
+        "AZURE_OPENAI_DEPLOYMENT_NAME",
+        "VECTOR_STORE_ID"
+    ]
+
+    missing_vars = []
+    for var in required_vars:
+        if not os.environ.get(var):
+            missing_vars.append(var)
+
+    if missing_vars:
+        print(f"   ✗ Missing environment variables: {', '.join(missing_vars)}")
+        print("   Please set the following:")
+        for var in missing_vars:
+            print(f"     export {var}=your_value")
+        return False
+    else:
+        print("   ✓ All required environment variables are set")
+        print(f"     Endpoint: {os.environ.get('AZURE_OPENAI_ENDPOINT')}")
+        print(f"     Deployment: {os.environ.get('AZURE_OPENAI_DEPLOYMENT_NAME')}")
+        print(f"     Vector Store: {os.environ.get('VECTOR_STORE_ID')}")
+
+    server = main.create_server()
+
+    # Tests 1-4 are independent, so run them concurrently and report in order
+    results = await asyncio.gather(
+        _test_list_tools(server),
+        _test_client_connectivity(),
+        _test_assistants(),
+        _test_vector_store(),
+        return_exceptions=True
+    )
+
+    # Only list_tools and client connectivity failures abort the validation
+    required_failed = False
+    for index, result in enumerate(results):
+        if isinstance(result, BaseException):
+            name, ok, lines = f"{index + 1}. Test raised unexpectedly", False, [f"   ✗ {result}"]
+        else:
+            name, ok, lines = result
+        print(f"\n{name}")
+        for line in lines:
+            print(line)
+        if not ok and index < 2:
+            required_failed = True
+
+    if required_failed:
+        return False
 
     # Test 5: Server accessibility  
     print("\n5. Testing server accessibility...")